@@ -1,11 +1,18 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import mysql.connector
-from mysql.connector import Error
-import seaborn as sns
-import matplotlib.pyplot as plt
+import plotly.graph_objects as go
+from tsdownsample import MinMaxLTTBDownsampler
+from mysql.connector import Error, pooling
 import os
+import time
+import shutil
+import tempfile
+import hashlib
+import functools
+import contextlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -34,28 +41,150 @@ except KeyError as e:
     st.info("Please configure your secrets in Streamlit Cloud or create a .streamlit/secrets.toml file locally.")
     st.stop()
 
+# Every query borrows a connection from one long-lived pool instead of sharing a single
+# connection, so queries can run concurrently. The pool still pings each connection
+# (is_connected()) when it is borrowed and reconnects it if the server dropped it.
+# It is one larger than a session's batch of workers, so a loading session never
+# holds every connection.
+QUERY_WORKERS = 4
+POOL_SIZE = QUERY_WORKERS + 1
+
 @st.cache_resource
-def init_connection():
-    """Initializes a connection to the MySQL database."""
+def init_pool():
+    """Initializes a pool of connections to the MySQL database."""
     try:
-        connection = mysql.connector.connect(**db_config)
+        connection_pool = pooling.MySQLConnectionPool(
+            pool_name="sales",
+            pool_size=POOL_SIZE,
+            pool_reset_session=False,   # Skip COM_RESET_CONNECTION on every return to the pool
+            autocommit=True,            # No open transaction (or stale snapshot) survives between borrows
+            **db_config
+        )
         st.success("✅ Database connection successful!")
-        return connection
+        return connection_pool
     except Error as e:
         st.error(f"Error connecting to MySQL database: {e}", icon="🔥")
         return None
-conn = init_connection()
+pool = init_pool()
+
+# MySQLConnectionPool.get_connection() raises as soon as the pool is empty, so borrows
+# are gated by a semaphore shared across sessions and wait for a free connection instead.
+POOL_TIMEOUT = 30 # Seconds to wait for a free connection
 
-@st.cache_data(ttl=600) # Cache data for 10 minutes
-def run_query(query):
-    """Executes a query and returns the result as a Pandas DataFrame."""
-    if conn:
+@st.cache_resource
+def init_pool_slots():
+    """Initializes the semaphore that counts free connections in the pool."""
+    return threading.BoundedSemaphore(POOL_SIZE)
+pool_slots = init_pool_slots()
+
+@contextlib.contextmanager
+def pooled_connection():
+    """Borrows a connection from the pool, waiting up to POOL_TIMEOUT seconds for one to free up."""
+    if not pool_slots.acquire(timeout=POOL_TIMEOUT):
+        raise pooling.PoolError("Timed out waiting for a free database connection")
+    try:
+        connection = pool.get_connection()
         try:
-            # Reconnect if connection is lost
-            if not conn.is_connected():
-                conn.reconnect()
-            df = pd.read_sql(query, conn)
+            yield connection
+        finally:
+            connection.close() # Returns the connection to the pool
+    finally:
+        pool_slots.release()
+
+# --- On-Disk Query Cache ---
+# st.cache_data only lives as long as the Streamlit process, so query results are
+# also persisted as parquet files to survive restarts and reloads.
+QUERY_CACHE_DIR = 'query_cache'
+
+def disk_cache(ttl):
+    """Caches a query function's DataFrame results as parquet files for `ttl` seconds."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(query, params=None):
+            key = hashlib.sha256(repr((query, params)).encode()).hexdigest()
+            path = os.path.join(QUERY_CACHE_DIR, f"{key}.parquet")
+            if os.path.exists(path):
+                if time.time() - os.path.getmtime(path) < ttl:
+                    try:
+                        return pd.read_parquet(path)
+                    except Exception:
+                        pass # Fall through and re-run the query on a corrupt file
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass # Already evicted by a concurrent query
+            df = func(query, params)
+            try:
+                os.makedirs(QUERY_CACHE_DIR, exist_ok=True)
+                # Write to a temp file and swap it in, so readers never see a partial file
+                fd, tmp_path = tempfile.mkstemp(dir=QUERY_CACHE_DIR, suffix='.tmp')
+                os.close(fd)
+                try:
+                    df.to_parquet(tmp_path, index=False, compression='zstd')
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            except Exception:
+                pass # The disk cache is best-effort
             return df
+        return wrapper
+    return decorator
+
+def clear_disk_cache():
+    """Removes every cached query result from disk."""
+    shutil.rmtree(QUERY_CACHE_DIR, ignore_errors=True)
+
+def downcast(df):
+    """Shrinks numeric columns to the smallest lossless dtype and low-cardinality text columns to categories."""
+    for col in df.select_dtypes('integer'):
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col in df.select_dtypes('float'):
+        as_float32 = df[col].astype('float32')
+        # Only keep float32 when every value round-trips exactly, so money totals stay exact
+        if as_float32.astype('float64').equals(df[col]):
+            df[col] = as_float32
+    for col in df.select_dtypes('object'):
+        if pd.api.types.infer_dtype(df[col]) == 'string' and df[col].nunique() / len(df) < 0.5:
+            df[col] = df[col].astype('category')
+    return df
+
+# Rows fetched per round of a streamed result set
+FETCH_CHUNK_SIZE = 50_000
+
+# Errors propagate out of the cached function so a failed query is never cached.
+# No spinner: it is also called from the worker threads of run_queries.
+@st.cache_data(ttl=600, show_spinner=False) # Cache data for 10 minutes
+@disk_cache(ttl=600)
+def fetch_query(query, params=None):
+    """Executes a query (with optional %s parameters) and returns the result as a Pandas DataFrame."""
+    with pooled_connection() as connection:
+        # Unbuffered cursor: rows are streamed from the server and converted in chunks
+        cursor = connection.cursor(buffered=False)
+        try:
+            cursor.execute(query, params)
+            columns = [col[0] for col in cursor.description]
+            chunks = []
+            while True:
+                rows = cursor.fetchmany(FETCH_CHUNK_SIZE)
+                if not rows:
+                    break
+                chunks.append(pd.DataFrame.from_records(rows, columns=columns, coerce_float=True))
+        finally:
+            # Drain any rows left on the wire if we stopped early, so the connection
+            # goes back to the pool clean instead of failing with "Unread result found"
+            if connection.unread_result:
+                connection.consume_results()
+            cursor.close()
+    if chunks:
+        return downcast(pd.concat(chunks, ignore_index=True, copy=False))
+    return pd.DataFrame(columns=columns)
+
+def run_query(query, params=None):
+    """Runs fetch_query, reporting any error and returning an empty DataFrame in its place."""
+    if pool:
+        try:
+            return fetch_query(query, params)
         except Exception as e:
             st.error(f"Failed to execute query: {e}", icon="⚠️")
             return pd.DataFrame() # Return empty DataFrame on error
@@ -64,31 +193,223 @@ def run_query(query):
 # --- Functions for Data Modification ---
 def execute_mod_query(query, params):
     """Executes a modification query (INSERT, DELETE)."""
-    if not conn or not conn.is_connected():
+    if not pool:
         st.error("Database is not connected.")
         return False
     try:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        conn.commit()
-        cursor.close()
-        # After modification, clear the cache to reflect changes
-        st.cache_data.clear()
-        return True
+        with pooled_connection() as connection:
+            try:
+                cursor = connection.cursor()
+                cursor.execute(query, params)
+                connection.commit()
+                cursor.close()
+            except Error:
+                connection.rollback()
+                raise
     except Error as e:
         st.error(f"Database error: {e}")
-        conn.rollback()
         return False
+    # After modification, clear the cache to reflect changes
+    st.cache_data.clear()
+    load_purchase_index.clear()
+    clear_disk_cache()
+    return True
+
+# --- Shared Fact Table ---
+# The overview, customer and shipping tabs all read the same orders x order_details join,
+# so it is fetched once and rolled up or sliced locally instead of re-joining per chart.
+fact_query = """
+SELECT
+    o.OrderID,
+    o.OrderDate,
+    o.ShipDate,
+    o.ShipMode,
+    o.CustomerID,
+    o.PostalCode,
+    od.ProductID,
+    od.Sales,
+    od.Quantity,
+    od.Discount,
+    od.Profit,
+    p.ProductName,
+    sc.SubCategoryName
+FROM orders o
+JOIN order_details od ON o.OrderID = od.OrderID
+LEFT JOIN products p ON od.ProductID = p.ProductID
+LEFT JOIN sub_categories sc ON p.SubCategoryID = sc.SubCategoryID;
+"""
+
+def prepare_fact(fact):
+    """Parses the date columns of the fetched orders/order_details join."""
+    if not fact.empty:
+        fact['OrderDate'] = pd.to_datetime(fact['OrderDate'])
+        fact['ShipDate'] = pd.to_datetime(fact['ShipDate'])
+    return fact
+
+# cache_resource hands back the same object (no copy), so a lookup stays an index slice.
+# It is keyed on the fact table's row count and latest order date; the leading underscore
+# keeps Streamlit from hashing the whole table on every call.
+@st.cache_resource(max_entries=1)
+def load_purchase_index(row_count, last_order_date, _fact):
+    """Returns the fact table indexed and sorted by CustomerID for per-customer lookups."""
+    return _fact.set_index('CustomerID').sort_index()
+
+def get_purchase_index(fact):
+    """Returns the purchase index for the fact table, caching it only when the table has rows."""
+    if fact.empty:
+        # The fact query failed; an empty frame matches no customer and is not cached,
+        # so the index is built as soon as the query succeeds again
+        return pd.DataFrame(index=pd.Index([], name='CustomerID'))
+    return load_purchase_index(len(fact), fact['OrderDate'].max(), fact)
+
+# --- Tab Queries ---
+# Product sales per product, with category and sub-category
+product_sales_query = """
+SELECT
+    c.CategoryName,
+    sc.SubCategoryName,
+    p.ProductName,
+    SUM(od.Sales) AS TotalSales,
+    SUM(od.Quantity) AS TotalQuantity,
+    SUM(od.Profit) AS TotalProfit
+FROM categories c
+JOIN sub_categories sc ON c.CategoryID = sc.CategoryID
+JOIN products p ON sc.SubCategoryID = p.SubCategoryID
+JOIN order_details od ON p.ProductID = od.ProductID
+GROUP BY c.CategoryName, sc.SubCategoryName, p.ProductName
+ORDER BY TotalSales DESC;
+"""
+
+# Sales per category, so the category pie needs no client-side rollup
+category_sales_query = """
+SELECT
+    c.CategoryName,
+    SUM(od.Sales) AS TotalSales
+FROM categories c
+JOIN sub_categories sc ON c.CategoryID = sc.CategoryID
+JOIN products p ON sc.SubCategoryID = p.SubCategoryID
+JOIN order_details od ON p.ProductID = od.ProductID
+GROUP BY c.CategoryName;
+"""
+
+# Sub-category profitability
+profitability_query = """
+SELECT
+    sc.SubCategoryName AS sub_category,
+    SUM(od.Profit) AS profit,
+    (SUM(od.Profit) / SUM(od.Sales)) * 100 AS profit_margin,
+    AVG(od.Discount) AS discount
+FROM
+    order_details od
+JOIN
+    products p ON od.ProductID = p.ProductID
+JOIN
+    sub_categories sc ON p.SubCategoryID = sc.SubCategoryID
+GROUP BY
+    sc.SubCategoryName
+ORDER BY
+    profit DESC;
+"""
+
+# Sales and order counts per customer
+customer_query = """
+SELECT
+    c.CustomerID,
+    c.CustomerName,
+    c.Segment,
+    SUM(od.Sales) as TotalSales,
+    COUNT(DISTINCT o.OrderID) as OrderCount
+FROM customers c
+JOIN orders o ON c.CustomerID = o.CustomerID
+JOIN order_details od ON o.OrderID = od.OrderID
+GROUP BY c.CustomerID, c.CustomerName, c.Segment
+ORDER BY TotalSales DESC;
+"""
+
+# Sales per customer segment
+segment_sales_query = """
+SELECT
+    c.Segment,
+    SUM(od.Sales) AS TotalSales
+FROM customers c
+JOIN orders o ON c.CustomerID = o.CustomerID
+JOIN order_details od ON o.OrderID = od.OrderID
+GROUP BY c.Segment
+ORDER BY c.Segment;
+"""
+
+# Sales per region
+region_sales_query = """
+SELECT
+    l.Region,
+    SUM(od.Sales) AS TotalSales
+FROM locations l
+JOIN orders o ON l.PostalCode = o.PostalCode
+JOIN order_details od ON o.OrderID = od.OrderID
+GROUP BY l.Region
+ORDER BY l.Region;
+"""
+
+# Sales and profit per city
+geo_query = """
+SELECT
+    l.Region,
+    l.State,
+    l.City,
+    SUM(od.Sales) as TotalSales,
+    SUM(od.Profit) as TotalProfit
+FROM locations l
+JOIN orders o ON l.PostalCode = o.PostalCode
+JOIN order_details od ON o.OrderID = od.OrderID
+GROUP BY l.Region, l.State, l.City
+ORDER BY TotalSales DESC;
+"""
+
+# All read-only queries needed on first paint, keyed by name
+QUERIES = {
+    'fact': fact_query,
+    'product': product_sales_query,
+    'category_sales': category_sales_query,
+    'profitability': profitability_query,
+    'customer': customer_query,
+    'segment_sales': segment_sales_query,
+    'geo': geo_query,
+    'region_sales': region_sales_query,
+}
+
+def run_queries(queries):
+    """Runs independent queries concurrently, each on its own pooled connection."""
+    if not pool:
+        return {name: pd.DataFrame() for name in queries}
+
+    def fetch(query):
+        try:
+            return fetch_query(query), None
+        except Exception as e:
+            return pd.DataFrame(), e
+
+    with ThreadPoolExecutor(max_workers=QUERY_WORKERS) as executor:
+        outcomes = dict(zip(queries, executor.map(fetch, queries.values())))
+
+    # Streamlit elements are not thread-safe, so errors are reported from the script thread
+    results = {}
+    for name, (df, error) in outcomes.items():
+        if error is not None:
+            st.error(f"Failed to execute query: {error}", icon="⚠️")
+        results[name] = df
+    return results
 
 # --- Main Application ---
 st.title("📊 Sales Analysis Dashboard")
 st.markdown("An interactive dashboard to analyze sales data directly from the database.")
 
 # Stop execution if connection failed
-if not conn or not conn.is_connected():
+if not pool:
     st.warning("Database connection is not available. Please check the credentials and `ca.pem` file.")
     st.stop()
 
+results = run_queries(QUERIES)
+fact = prepare_fact(results['fact'])
 
 # --- Define Tabs ---
 tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
@@ -102,113 +423,101 @@ tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
 
 
 # --- TAB 1: Dashboard Overview ---
-with tab1:
+@st.fragment
+def overview_tab():
     st.header("Dashboard Overview")
 
-    # KPIs Query
-    kpi_query = """
-    SELECT
-        SUM(od.Sales) AS TotalSales,
-        SUM(od.Profit) AS TotalProfit,
-        COUNT(DISTINCT o.OrderID) AS TotalOrders,
-        AVG(od.Sales) AS AverageSale
-    FROM orders o
-    JOIN order_details od ON o.OrderID = od.OrderID;
-    """
-    kpi_data = run_query(kpi_query)
-
-    if not kpi_data.empty and kpi_data['TotalSales'].iloc[0] is not None:
+    # KPIs
+    if not fact.empty:
         col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Total Sales", f"${kpi_data['TotalSales'].iloc[0]:,.2f}")
-        col2.metric("Total Profit", f"${kpi_data['TotalProfit'].iloc[0]:,.2f}")
-        col3.metric("Total Orders", f"{kpi_data['TotalOrders'].iloc[0]:,}")
-        col4.metric("Average Sale Value", f"${kpi_data['AverageSale'].iloc[0]:,.2f}")
+        col1.metric("Total Sales", f"${fact['Sales'].sum():,.2f}")
+        col2.metric("Total Profit", f"${fact['Profit'].sum():,.2f}")
+        col3.metric("Total Orders", f"{fact['OrderID'].nunique():,}")
+        col4.metric("Average Sale Value", f"${fact['Sales'].mean():,.2f}")
     else:
         st.info("No data available for KPIs. Please check if the database contains data.")
     st.markdown("---")
 
     # Time Series Chart
-    sales_over_time_query = """
-    SELECT
-        o.OrderDate,
-        SUM(od.Sales) as DailySales
-    FROM orders o
-    JOIN order_details od ON o.OrderID = od.OrderID
-    GROUP BY o.OrderDate
-    ORDER BY o.OrderDate;
-    """
-    sales_over_time = run_query(sales_over_time_query)
-
-    if not sales_over_time.empty:
-        sales_over_time['OrderDate'] = pd.to_datetime(sales_over_time['OrderDate'])
+    if not fact.empty:
+        sales_over_time = fact.groupby('OrderDate', as_index=False)['Sales'].sum().rename(columns={'Sales': 'DailySales'})
+        # Downsample (MinMaxLTTB) so at most 2000 points are sent to the browser
+        if len(sales_over_time) > 2000:
+            keep = MinMaxLTTBDownsampler().downsample(
+                sales_over_time['OrderDate'].to_numpy(), sales_over_time['DailySales'].to_numpy(),
+                n_out=2000
+            )
+            sales_over_time = sales_over_time.iloc[keep]
         fig = px.line(sales_over_time, x='OrderDate', y='DailySales', title='Sales Over Time',
                       labels={'OrderDate': 'Date', 'DailySales': 'Total Sales ($)'})
         st.plotly_chart(fig, use_container_width=True)
 
+with tab1:
+    overview_tab()
+
 
 # --- TAB 2: Product Analysis ---
-with tab2:
+# Keyed on a hash of the DataFrame, so reruns with unchanged data reuse the figure
+@st.cache_data
+def make_profitability_fig(profitability_data):
+    """Builds the avg profit margin vs. avg discount scatter for each sub-category."""
+    # A single WebGL trace carries the markers and their labels
+    fig = go.Figure(go.Scattergl(
+        x=profitability_data['discount'],
+        y=profitability_data['profit_margin'],
+        mode='markers+text',
+        text=profitability_data['sub_category'],
+        textposition='middle right',
+        textfont=dict(size=11),
+        marker=dict(
+            size=18,
+            color=profitability_data['profit'],     # color by profit
+            colorscale='RdBu',                      # diverging palette
+            colorbar=dict(title='Profit'),
+            showscale=True
+        ),
+        hovertemplate='%{text}<br>Discount: %{x:.2%}<br>Profit Margin: %{y:.2f}%<extra></extra>'
+    ))
+    fig.update_layout(
+        title='Avg Profit Margin (%) vs. Avg Discount by Sub-Category',
+        xaxis_title='Average Discount Applied',
+        yaxis_title='Average Profit Margin (%)',
+        height=600
+    )
+
+    # --- Red dashed quadrant lines ---
+    fig.add_hline(y=0, line_dash='dash', line_color='red', line_width=1.5)       # Profit margin = 0 line
+    fig.add_vline(x=0.20, line_dash='dash', line_color='red', line_width=1.5)    # 20% discount threshold
+    return fig
+
+@st.fragment
+def product_tab():
     st.header("Product & Category Performance")
 
-    # Product Sales Query
-    product_sales_query = """
-    SELECT
-        c.CategoryName,
-        sc.SubCategoryName,
-        p.ProductName,
-        SUM(od.Sales) AS TotalSales,
-        SUM(od.Quantity) AS TotalQuantity,
-        SUM(od.Profit) AS TotalProfit
-    FROM categories c
-    JOIN sub_categories sc ON c.CategoryID = sc.CategoryID
-    JOIN products p ON sc.SubCategoryID = p.SubCategoryID
-    JOIN order_details od ON p.ProductID = od.ProductID
-    GROUP BY c.CategoryName, sc.SubCategoryName, p.ProductName
-    ORDER BY TotalSales DESC;
-    """
-    product_data = run_query(product_sales_query)
+    product_data = results['product']
+    category_sales = results['category_sales']
+    profitability_data = results['profitability']
 
     if not product_data.empty:
         col1, col2 = st.columns(2)
         with col1:
             # Sales by Category
-            sales_by_cat = product_data.groupby('CategoryName')['TotalSales'].sum().reset_index()
-            fig_cat = px.pie(sales_by_cat, names='CategoryName', values='TotalSales',
-                             title='Sales Distribution by Category', hole=0.4)
-            st.plotly_chart(fig_cat, use_container_width=True)
+            if not category_sales.empty:
+                fig_cat = px.pie(category_sales, names='CategoryName', values='TotalSales',
+                                 title='Sales Distribution by Category', hole=0.4)
+                st.plotly_chart(fig_cat, use_container_width=True)
         with col2:
             # Profit by Sub-Category
-            profit_by_subcat = product_data.groupby('SubCategoryName')['TotalProfit'].sum().reset_index().sort_values(by='TotalProfit', ascending=False)
-            fig_subcat = px.bar(profit_by_subcat, x='SubCategoryName', y='TotalProfit',
-                                title='Profit by Sub-Category', labels={'SubCategoryName': 'Sub-Category', 'TotalProfit': 'Total Profit ($)'})
-            st.plotly_chart(fig_subcat, use_container_width=True)
+            # profitability_data is already grouped by sub-category and sorted by profit
+            if not profitability_data.empty:
+                fig_subcat = px.bar(profitability_data, x='sub_category', y='profit',
+                                    title='Profit by Sub-Category', labels={'sub_category': 'Sub-Category', 'profit': 'Total Profit ($)'})
+                st.plotly_chart(fig_subcat, use_container_width=True)
 
         st.markdown("---")
         st.markdown("### Sub-Category Profitability Analysis")
         st.info("This plot visualizes average profit margin vs. average discount for each sub-category, colored by total profit.")
 
-        # --- SQL Query ---
-        profitability_query = """
-        SELECT
-            sc.SubCategoryName AS sub_category,
-            SUM(od.Profit) AS profit,
-            (SUM(od.Profit) / SUM(od.Sales)) * 100 AS profit_margin,
-            AVG(od.Discount) AS discount
-        FROM
-            order_details od
-        JOIN
-            products p ON od.ProductID = p.ProductID
-        JOIN
-            sub_categories sc ON p.SubCategoryID = sc.SubCategoryID
-        GROUP BY
-            sc.SubCategoryName
-        ORDER BY
-            profit DESC;
-        """
-
-        # --- Run query ---
-        profitability_data = run_query(profitability_query)
-
         # --- Check & plot ---
         if not profitability_data.empty:
             st.dataframe(
@@ -222,39 +531,8 @@ with tab2:
 
             st.markdown("### 📊 Avg Profit Margin (%) vs. Avg Discount by Sub-Category")
 
-            # --- Visualization ---
-            fig, ax = plt.subplots(figsize=(14, 8))
-
-            sns.scatterplot(
-                x='discount',
-                y='profit_margin',
-                data=profitability_data,
-                s=250,              # bubble size
-                hue='profit',       # color by profit
-                palette='RdBu',     # diverging palette
-                ax=ax
-            )
-
-            # --- Red dashed quadrant lines ---
-            ax.axhline(0, color='red', linestyle='--', linewidth=1.5)       # Profit margin = 0 line
-            ax.axvline(0.20, color='red', linestyle='--', linewidth=1.5)    # 20% discount threshold
-
-            # --- Labels for each sub-category ---
-            for i in range(profitability_data.shape[0]):
-                ax.text(
-                    x=profitability_data['discount'][i] + 0.005,
-                    y=profitability_data['profit_margin'][i],
-                    s=profitability_data['sub_category'][i],
-                    fontsize=9,
-                    color='black'
-                )
-
-            # --- Titles & style ---
-            ax.set_title('Avg Profit Margin (%) vs. Avg Discount by Sub-Category', fontsize=16)
-            ax.set_xlabel('Average Discount Applied', fontsize=12)
-            ax.set_ylabel('Average Profit Margin (%)', fontsize=12)
-            sns.despine()
-            st.pyplot(fig)
+            fig = make_profitability_fig(profitability_data)
+            st.plotly_chart(fig, use_container_width=True)
 
         else:
             st.warning("No data available for profitability analysis.")
@@ -264,106 +542,99 @@ with tab2:
         replenish_table = product_data[['ProductName', 'CategoryName', 'TotalQuantity', 'TotalSales']].sort_values(by='TotalQuantity', ascending=False).head(20)
         st.dataframe(replenish_table, use_container_width=True)
 
+with tab2:
+    product_tab()
+
+
 # --- TAB 3: Customer Analysis ---
-with tab3:
+@st.cache_data
+def customer_names(customer_data):
+    """Returns the distinct customer names, in the order of customer_data (top sales first)."""
+    return list(customer_data['CustomerName'].unique())
+
+@st.cache_data
+def name_to_id(customer_data):
+    """Maps each customer name to its CustomerID (the first one, if a name is shared)."""
+    first_by_name = customer_data.drop_duplicates(subset=['CustomerName'])
+    return dict(zip(first_by_name['CustomerName'], first_by_name['CustomerID']))
+
+@st.fragment
+def customer_tab():
     st.header("Customer Insights")
-    # Customer Data Query
-    customer_query = """
-    SELECT
-        c.CustomerID,
-        c.CustomerName,
-        c.Segment,
-        SUM(od.Sales) as TotalSales,
-        COUNT(DISTINCT o.OrderID) as OrderCount
-    FROM customers c
-    JOIN orders o ON c.CustomerID = o.CustomerID
-    JOIN order_details od ON o.OrderID = od.OrderID
-    GROUP BY c.CustomerID, c.CustomerName, c.Segment
-    ORDER BY TotalSales DESC;
-    """
-    customer_data = run_query(customer_query)
+    customer_data = results['customer']
+    segment_sales = results['segment_sales']
 
     if not customer_data.empty:
         # Sales by Segment
-        sales_by_segment = customer_data.groupby('Segment')['TotalSales'].sum().reset_index()
-        fig_segment = px.bar(sales_by_segment, x='Segment', y='TotalSales', title='Sales by Customer Segment', color='Segment')
-        st.plotly_chart(fig_segment, use_container_width=True)
+        if not segment_sales.empty:
+            fig_segment = px.bar(segment_sales, x='Segment', y='TotalSales', title='Sales by Customer Segment', color='Segment')
+            st.plotly_chart(fig_segment, use_container_width=True)
 
         st.markdown("### Customer Product Purchase History")
         # Customer Selection
-        customer_list = customer_data['CustomerName'].unique()
-        selected_customer = st.selectbox("Select a Customer to view their purchase history:", customer_list)
+        selected_customer = st.selectbox("Select a Customer to view their purchase history:", customer_names(customer_data))
 
         if selected_customer:
-            customer_id = customer_data[customer_data['CustomerName'] == selected_customer]['CustomerID'].iloc[0]
-            # Query for selected customer's purchases
-            purchase_history_query = f"""
-            SELECT
-                o.OrderDate,
-                p.ProductName,
-                sc.SubCategoryName,
-                od.Quantity,
-                od.Sales,
-                od.Profit
-            FROM order_details od
-            JOIN orders o ON od.OrderID = o.OrderID
-            JOIN products p ON od.ProductID = p.ProductID
-            JOIN sub_categories sc ON p.SubCategoryID = sc.SubCategoryID
-            WHERE o.CustomerID = '{customer_id}'
-            ORDER BY o.OrderDate DESC;
-            """
-            purchase_history = run_query(purchase_history_query)
+            customer_id = name_to_id(customer_data)[selected_customer]
+            # Slice the selected customer's purchases from the cached fact table
+            purchase_index = get_purchase_index(fact)
+            if customer_id in purchase_index.index:
+                purchase_history = (
+                    purchase_index.loc[[customer_id], ['OrderDate', 'ProductName', 'SubCategoryName', 'Quantity', 'Sales', 'Profit']]
+                    .sort_values(by='OrderDate', ascending=False)
+                    .reset_index(drop=True)
+                )
+                purchase_history['OrderDate'] = purchase_history['OrderDate'].dt.date
+            else:
+                purchase_history = pd.DataFrame()
             st.dataframe(purchase_history, use_container_width=True)
 
+with tab3:
+    customer_tab()
+
 
 # --- TAB 4: Geographical Insights ---
-with tab4:
+@st.fragment
+def geo_tab():
     st.header("Geographical Sales Analysis")
-    geo_query = """
-    SELECT
-        l.Region,
-        l.State,
-        l.City,
-        SUM(od.Sales) as TotalSales,
-        SUM(od.Profit) as TotalProfit
-    FROM locations l
-    JOIN orders o ON l.PostalCode = o.PostalCode
-    JOIN order_details od ON o.OrderID = od.OrderID
-    GROUP BY l.Region, l.State, l.City
-    ORDER BY TotalSales DESC;
-    """
-    geo_data = run_query(geo_query)
+    geo_data = results['geo']
+    region_sales = results['region_sales']
 
     if not geo_data.empty:
         col1, col2 = st.columns([1,2])
         with col1:
              # Sales by Region
-            sales_by_region = geo_data.groupby('Region')['TotalSales'].sum().reset_index()
-            fig_region = px.pie(sales_by_region, names='Region', values='TotalSales',
-                                title='Sales by Region', hole=0.4)
-            st.plotly_chart(fig_region, use_container_width=True)
+            if not region_sales.empty:
+                fig_region = px.pie(region_sales, names='Region', values='TotalSales',
+                                    title='Sales by Region', hole=0.4)
+                st.plotly_chart(fig_region, use_container_width=True)
         with col2:
             # Sales by State
-            sales_by_state = geo_data.groupby('State')['TotalSales'].sum().reset_index().sort_values(by='TotalSales', ascending=False)
+            sales_by_state = geo_data.groupby('State', observed=True)['TotalSales'].sum().reset_index().sort_values(by='TotalSales', ascending=False)
             fig_state = px.bar(sales_by_state.head(15), x='State', y='TotalSales', title='Top 15 States by Sales')
             st.plotly_chart(fig_state, use_container_width=True)
 
+with tab4:
+    geo_tab()
+
 
 # --- TAB 5: Order & Shipping ---
-with tab5:
+@st.fragment
+def shipping_tab():
     st.header("Order & Shipping Mode Analysis")
 
-    shipping_query = """
-    SELECT
-        o.ShipMode,
-        AVG(DATEDIFF(o.ShipDate, o.OrderDate)) as AvgShippingTime,
-        SUM(od.Sales) as TotalSales,
-        COUNT(DISTINCT o.OrderID) as OrderCount
-    FROM orders o
-    JOIN order_details od ON o.OrderID = od.OrderID
-    GROUP BY o.ShipMode;
-    """
-    shipping_data = run_query(shipping_query)
+    if not fact.empty:
+        shipping_data = (
+            fact.assign(ShippingDays=(fact['ShipDate'] - fact['OrderDate']).dt.days)
+            .groupby('ShipMode', as_index=False, observed=True)
+            .agg(
+                AvgShippingTime=('ShippingDays', 'mean'),
+                TotalSales=('Sales', 'sum'),
+                OrderCount=('OrderID', 'nunique')
+            )
+        )
+    else:
+        shipping_data = pd.DataFrame()
 
     if not shipping_data.empty:
         col1, col2 = st.columns(2)
@@ -376,8 +647,12 @@ with tab5:
                                    title='Average Shipping Time (Days) by Ship Mode', color='ShipMode')
             st.plotly_chart(fig_ship_time, use_container_width=True)
 
+with tab5:
+    shipping_tab()
+
 
 # --- TAB 6: Data Management ---
+# Not a fragment: modifications clear the caches, so the whole app must rerun to refresh the other tabs
 with tab6:
     st.header("Data Management")
 
@@ -411,11 +686,11 @@ with tab6:
         search_term = st.text_input("Search Product ID (leave blank to show all)", key="search_product")
 
         if search_term:
-            query = f"SELECT * FROM products WHERE ProductID LIKE '%{search_term}%'"
+            query = "SELECT * FROM products WHERE ProductID LIKE %s"
+            product_data = run_query(query, (f"%{search_term}%",))
         else:
             query = "SELECT * FROM products"
-
-        product_data = run_query(query)
+            product_data = run_query(query)
 
 
         if not product_data.empty:
@@ -1,17 +1,54 @@
 import pandas as pd
+import numpy as np
 import os
+import numpy_groupies as npg
+
+# Explicit column types for the Superstore CSV so the parser skips dtype inference.
+# Monetary columns stay float64 to keep the aggregated totals exact to the cent.
+SUPERSTORE_DTYPES = {
+    'Row ID': 'int32',
+    'Order ID': 'string[pyarrow]',
+    'Order Date': 'string[pyarrow]',
+    'Ship Date': 'string[pyarrow]',
+    'Ship Mode': 'string[pyarrow]',
+    'Customer ID': 'string[pyarrow]',
+    'Customer Name': 'string[pyarrow]',
+    'Segment': 'string[pyarrow]',
+    'Country': 'string[pyarrow]',
+    'City': 'string[pyarrow]',
+    'State': 'string[pyarrow]',
+    'Postal Code': 'int32',
+    'Region': 'string[pyarrow]',
+    'Product ID': 'string[pyarrow]',
+    'Category': 'string[pyarrow]',
+    'Sub-Category': 'string[pyarrow]',
+    'Product Name': 'string[pyarrow]',
+    'Sales': 'float64',
+    'Quantity': 'int16',
+    'Discount': 'float64',
+    'Profit': 'float64',
+}
+
+def save_table(df, output_dir, name):
+    """
+    Saves a table as zstd-compressed Parquet for Python consumers, plus a CSV
+    copy for MySQL LOAD DATA / Workbench imports, which cannot read Parquet.
+    """
+    df.to_parquet(os.path.join(output_dir, f'{name}.parquet'), index=False, compression='zstd', engine='pyarrow')
+    df.to_csv(os.path.join(output_dir, f'{name}.csv'), index=False)
+    print(f"Created {name}.parquet and {name}.csv")
 
 def normalize_superstore_data(input_csv_path='Sample - Superstore.csv'):
     """
     Reads the Superstore CSV, normalizes its structure to 5NF,
-    and saves the resulting tables as separate CSV files.
+    and saves the resulting tables as separate Parquet and CSV files.
 
     Args:
         input_csv_path (str): The path to the input CSV file.
     """
     # --- 1. Load the Dataset ---
     try:
-        df = pd.read_csv(input_csv_path, encoding='windows-1252')
+        df = pd.read_csv(input_csv_path, encoding='windows-1252', engine='pyarrow', dtype=SUPERSTORE_DTYPES)
         print(f"Successfully loaded '{input_csv_path}'.")
     except FileNotFoundError:
         print(f"Error: The file '{input_csv_path}' was not found.")
@@ -34,50 +71,47 @@ def normalize_superstore_data(input_csv_path='Sample - Superstore.csv'):
     # FIX: Ensure uniqueness on 'Customer ID'
     df_customers = df[['Customer ID', 'Customer Name', 'Segment']].drop_duplicates(subset=['Customer ID']).reset_index(drop=True)
     df_customers.rename(columns={'Customer ID': 'CustomerID', 'Customer Name': 'CustomerName'}, inplace=True)
-    df_customers.to_csv(os.path.join(output_dir, 'customers.csv'), index=False)
-    print("Created customers.csv")
+    save_table(df_customers, output_dir, 'customers')
 
     # Table: Locations
     # Contains geographical information based on postal code.
     # PK: Postal Code
     df_locations = df[['Postal Code', 'City', 'State', 'Region']].drop_duplicates(subset=['Postal Code']).reset_index(drop=True)
     df_locations.rename(columns={'Postal Code': 'PostalCode'}, inplace=True)
-    df_locations.to_csv(os.path.join(output_dir, 'locations.csv'), index=False)
-    print("Created locations.csv")
+    save_table(df_locations, output_dir, 'locations')
 
     # Table: Categories
     # Contains unique product categories.
     # PK: CategoryID (surrogate key)
-    df_categories = pd.DataFrame(df['Category'].unique(), columns=['CategoryName'])
-    df_categories['CategoryID'] = df_categories.index + 1  # Create a simple surrogate key
-    df_categories = df_categories[['CategoryID', 'CategoryName']]
-    df_categories.to_csv(os.path.join(output_dir, 'categories.csv'), index=False)
-    print("Created categories.csv")
+    # Factorize once so the surrogate keys come straight from the integer codes.
+    category_codes, category_names = pd.factorize(df['Category'])
+    df_categories = pd.DataFrame({
+        'CategoryID': np.arange(1, len(category_names) + 1),
+        'CategoryName': category_names
+    })
+    save_table(df_categories, output_dir, 'categories')
 
     # Table: SubCategories
     # Links sub-categories to their parent categories.
     # PK: SubCategoryID (surrogate key), FK: CategoryID
-    df_sub_categories = df[['Category', 'Sub-Category']].drop_duplicates().reset_index(drop=True)
-    df_sub_categories.rename(columns={'Category': 'CategoryName', 'Sub-Category': 'SubCategoryName'}, inplace=True)
-    
-    # Merge to get CategoryID
-    df_sub_categories = pd.merge(df_sub_categories, df_categories, on='CategoryName')
-    df_sub_categories['SubCategoryID'] = df_sub_categories.index + 1 # Surrogate key
-    df_sub_categories = df_sub_categories[['SubCategoryID', 'SubCategoryName', 'CategoryID']]
-    df_sub_categories.to_csv(os.path.join(output_dir, 'sub_categories.csv'), index=False)
-    print("Created sub_categories.csv")
+    # ngroup() numbers each (Category, Sub-Category) pair in order of first appearance,
+    # so no merge against df_categories is needed to resolve CategoryID.
+    df['CategoryID'] = category_codes + 1
+    df['SubCategoryID'] = df.groupby(['Category', 'Sub-Category'], sort=False).ngroup() + 1
+    df_sub_categories = df[['SubCategoryID', 'Sub-Category', 'CategoryID']].drop_duplicates(subset=['SubCategoryID']).reset_index(drop=True)
+    df_sub_categories.rename(columns={'Sub-Category': 'SubCategoryName'}, inplace=True)
+    save_table(df_sub_categories, output_dir, 'sub_categories')
 
     # Table: Products
     # Contains information about each unique product.
     # PK: ProductID, FK: SubCategoryID
+    # Map sub-category names to their IDs with a plain dict lookup instead of a merge.
+    sub_category_map = dict(zip(df_sub_categories['SubCategoryName'], df_sub_categories['SubCategoryID']))
     df_products = df[['Product ID', 'Product Name', 'Sub-Category']].drop_duplicates(subset=['Product ID']).reset_index(drop=True)
-    df_products.rename(columns={'Product ID': 'ProductID', 'Product Name': 'ProductName', 'Sub-Category': 'SubCategoryName'}, inplace=True)
-    
-    # Merge to get SubCategoryID
-    df_products = pd.merge(df_products, df_sub_categories[['SubCategoryID', 'SubCategoryName']], on='SubCategoryName')
+    df_products.rename(columns={'Product ID': 'ProductID', 'Product Name': 'ProductName'}, inplace=True)
+    df_products['SubCategoryID'] = df_products['Sub-Category'].map(sub_category_map)
     df_products = df_products[['ProductID', 'ProductName', 'SubCategoryID']]
-    df_products.to_csv(os.path.join(output_dir, 'products.csv'), index=False)
-    print("Created products.csv")
+    save_table(df_products, output_dir, 'products')
 
     # Table: Orders
     # Contains information about each order transaction.
@@ -87,22 +121,23 @@ def normalize_superstore_data(input_csv_path='Sample - Superstore.csv'):
         'Order ID': 'OrderID', 'Order Date': 'OrderDate', 'Ship Date': 'ShipDate',
         'Ship Mode': 'ShipMode', 'Customer ID': 'CustomerID', 'Postal Code': 'PostalCode'
     }, inplace=True)
-    df_orders.to_csv(os.path.join(output_dir, 'orders.csv'), index=False)
-    print("Created orders.csv")
+    save_table(df_orders, output_dir, 'orders')
 
     # Table: OrderDetails
     # This is the junction/linking table for orders and products.
     # PK: (OrderID, ProductID) (composite key)
     # FIX: Aggregate duplicate Order/Product pairs.
-    df_order_details = df.groupby(['Order ID', 'Product ID']).agg({
-        'Sales': 'sum',
-        'Quantity': 'sum',
-        'Discount': 'mean',
-        'Profit': 'sum'
-    }).reset_index()
-    df_order_details.rename(columns={'Order ID': 'OrderID', 'Product ID': 'ProductID'}, inplace=True)
-    df_order_details.to_csv(os.path.join(output_dir, 'order_details.csv'), index=False)
-    print("Created order_details.csv")
+    # Factorize the composite key (sorted, matching groupby order) and aggregate the
+    # integer codes with numpy_groupies' pure-numpy backend (no JIT start-up cost).
+    order_product = pd.MultiIndex.from_arrays([df['Order ID'], df['Product ID']])
+    codes, pairs = order_product.factorize(sort=True)
+    n_pairs = len(pairs)
+    df_order_details = pairs.to_frame(index=False, name=['OrderID', 'ProductID'])
+    df_order_details['Sales'] = npg.aggregate_np(codes, df['Sales'].to_numpy(), func='sum', size=n_pairs)
+    df_order_details['Quantity'] = npg.aggregate_np(codes, df['Quantity'].to_numpy(np.int64), func='sum', size=n_pairs)
+    df_order_details['Discount'] = npg.aggregate_np(codes, df['Discount'].to_numpy(), func='mean', size=n_pairs)
+    df_order_details['Profit'] = npg.aggregate_np(codes, df['Profit'].to_numpy(), func='sum', size=n_pairs)
+    save_table(df_order_details, output_dir, 'order_details')
 
     print(f"\nNormalization complete. All files are saved in the '{output_dir}' directory.")
 